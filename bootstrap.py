@@ -17,13 +17,11 @@ FLAG_FILE = os.path.join(USER_DATA, '.setup_complete')
 
 def is_chromium_installed():
     """Checks if Chromium is installed in the ms-playwright directory."""
-    playwright_browsers_path = os.path.join(os.path.expanduser("~"), "AppData", "Local", "ms-playwright")
-    if not os.path.isdir(playwright_browsers_path):
-        return False
-    for item in os.listdir(playwright_browsers_path):
-        if item.startswith("chromium-") and os.path.isdir(os.path.join(playwright_browsers_path, item)):
-            return True
-    return False
+    # 설정 마법사와 같은 기준으로 판단 (하위 프로세스 없이 파일 존재 여부만 확인)
+    if BUNDLE_DIR not in sys.path:
+        sys.path.insert(0, BUNDLE_DIR)
+    from setup_wizard import is_chromium_installed as _is_chromium_installed
+    return _is_chromium_installed()
 
 def launch_module(module_name):
     """지정된 모듈을 직접 import하여 실행합니다."""
@@ -42,6 +40,9 @@ def launch_module(module_name):
             import setup_wizard
             wizard = setup_wizard.SetupWizard()
             wizard.mainloop()
+            # 설정이 완료되면 재시작하지 않고 같은 프로세스에서 메인 GUI 실행 (오류는 아래에서 메시지로 표시)
+            if wizard.launch_main_requested:
+                launch_module("gui")
         else:
             print(f"알 수 없는 모듈: {module_name}", file=sys.stderr)
             sys.exit(1)
@@ -66,8 +67,5 @@ if __name__ == "__main__":
     if is_chromium_installed():
         launch_module("gui")
     else:
-        if not is_chromium_installed():
-            print("Chromium 브라우저가 설치되어 있지 않습니다. 설정 마법사를 시작합니다...")
-        else:
-            print("Chromium 브라우저는 설치되어 있지만, 초기 설정이 완료되지 않았습니다. 설정 마법사를 시작합니다...")
+        print("Chromium 브라우저가 설치되어 있지 않습니다. 설정 마법사를 시작합니다...")
         launch_module("setup_wizard")
@@ -29,6 +29,7 @@ a = Analysis(
         'asyncio',
         'threading',
         'json',
+        'orjson',
         'subprocess',
     ],
     hookspath=[],
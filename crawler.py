@@ -1308,6 +1308,13 @@ class PixaiCrawler:
             except Exception:
                 pass
 
+    async def image_gen_macro_batch(self, tasks):
+        """
+        (prompt_text, output_dir)를 내보내는 비동기 이터러블을 순서대로 생성하고, 각 작업의 image_gen_macro 결과를 yield 합니다.
+        """
+        async for prompt_text, output_dir in tasks:
+            yield await self.image_gen_macro(prompt_text=prompt_text, output_dir=output_dir)
+
     async def get_active_config(self):
         with log.context("현재 설정된 모델/LoRA 확인"):
             try:
@@ -2,13 +2,29 @@ import tkinter as tk
 from tkinter import scrolledtext, messagebox, ttk, simpledialog
 from PIL import Image, ImageTk
 import asyncio
+import bisect
+import io
+import concurrent.futures
 import threading
+import queue
+import functools
 import json
+import pickle
 import re
 import shutil
+import tempfile
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import MappingProxyType
 from crawler import PixaiCrawler
 import os, sys, shutil
 
+try:
+    import orjson
+except ImportError:
+    # orjson이 없으면 표준 json 모듈로 대체
+    orjson = None
+
 if getattr(sys, 'frozen', False):
     # When running as a bundled app, tell Playwright to use the browsers installed in the user's AppData
     os.environ['PLAYWRIGHT_BROWSERS_PATH'] = os.path.join(os.path.expanduser("~"), "AppData", "Local", "ms-playwright")
@@ -30,6 +46,8 @@ os.makedirs(APP_USER_DIR, exist_ok=True)
 # 실제 읽고 쓸 파일들의 최종 경로 (이제 AppData를 가리킴)
 PROMPT_FILE = os.path.join(APP_USER_DIR, "prompts.json")
 MODEL_PRESETS_FILE = os.path.join(APP_USER_DIR, "model_presets.json")
+MODEL_PRESETS_INDEX_FILE = MODEL_PRESETS_FILE + ".idx.pkl" # 모델 프리셋 검색 인덱스 캐시
+MODEL_PRESETS_INDEX_FORMAT = 1 # _sanitize / _make_model_preset_index_key의 키 형식이 바뀌면 올려서 기존 캐시를 버림
 USER_DATA = os.path.join(APP_USER_DIR, "playwright_user_data") # Playwright 사용자 데이터
 
 # --- 최초 실행 시 사용자 파일 초기화 ---
@@ -48,12 +66,171 @@ def initialize_user_file(user_file_path, default_file_name):
         else:
             print(f"기본 파일을 찾을 수 없습니다: {default_file_path}", file=sys.stderr)
 
+def load_json_file(path):
+    """JSON 파일을 읽습니다. 파싱 실패 시 json.JSONDecodeError를 발생시킵니다."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def atomic_write_json(path, obj):
+    """obj를 JSON으로 직렬화하여 atomic_write_bytes로 저장합니다."""
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    else:
+        # orjson 설치 여부와 관계없이 같은 파일 형식이 되도록 OPT_INDENT_2와 같은 2칸 들여쓰기 사용
+        data = json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    atomic_write_bytes(path, data)
+
+def atomic_write_bytes(path, data):
+    """임시 파일에 한 번에 쓴 뒤 교체하여, 저장 도중 종료되어도 기존 파일이 깨지지 않게 합니다."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
 initialize_user_file(PROMPT_FILE, "prompts.json")
 initialize_user_file(MODEL_PRESETS_FILE, "model_presets.json")
 
 # (선택) 상대경로 동작을 원하면 활성화
 os.chdir(BASE)
 
+# 모델/LoRA/프리셋 이름 비교 및 폴더명 생성에 쓰는 정규화
+_SANITIZE_RE = re.compile(r'[\W_]+')
+# ASCII 이름용 빠른 경로: 영숫자가 아닌 ASCII 문자를 모두 제거하는 변환 테이블
+_SANITIZE_ASCII_TABLE = str.maketrans('', '', ''.join(chr(i) for i in range(128) if not chr(i).isalnum()))
+
+@functools.lru_cache(maxsize=2048)
+def _sanitize(name: str) -> str:
+    """Strips non-alphanumeric characters and lowercases a name (cached)."""
+    if name.isascii():
+        return name.lower().translate(_SANITIZE_ASCII_TABLE)
+    return _SANITIZE_RE.sub('', name).lower()
+
+@functools.lru_cache(maxsize=1024)
+def _parse_lora_cached(lora_str: str) -> tuple[Mapping, ...]:
+    """
+    'lora a:0.8, lora b' 형식의 LoRA 문자열을 파싱합니다.
+    결과가 캐시되어 공유되므로 읽기 전용 매핑의 튜플을 반환합니다.
+    """
+    loras_with_weights = []
+    for part in (l.strip() for l in lora_str.split(',')):
+        if not part:
+            continue
+        if ':' in part:
+            name, _, weight_str = part.rpartition(':')
+            try:
+                # Validate that weight is a float
+                float(weight_str)
+                loras_with_weights.append({'name': name.strip(), 'weight': weight_str.strip()})
+            except ValueError:
+                # If weight is not a valid float, treat the whole thing as a name
+                loras_with_weights.append({'name': part, 'weight': None})
+        else:
+            loras_with_weights.append({'name': part, 'weight': None})
+    return tuple(MappingProxyType(l) for l in loras_with_weights)
+
+# 프리셋 전체를 순회하는 검사에서도 캐시가 밀려나지 않도록 넉넉하게 잡음
+@functools.lru_cache(maxsize=1024)
+def _tokenize_prompt_cached(prompt_str: str) -> tuple[str, ...]:
+    """쉼표로 구분된 프롬프트를 공백을 제거한 토큰 튜플로 나눕니다. 빈 토큰은 버립니다."""
+    return tuple(p for p in (x.strip() for x in prompt_str.split(',')) if p)
+
+@functools.lru_cache(maxsize=1024)
+def _prompt_token_set_cached(prompt_str: str) -> frozenset[str]:
+    """_tokenize_prompt_cached 결과의 집합 (포함 여부 검사용)."""
+    return frozenset(_tokenize_prompt_cached(prompt_str))
+
+# 결과 이미지 미리보기 캐시
+PREVIEW_CACHE_SIZE = 16
+PREVIEW_SIZE_STEP = 16  # 레이블 크기 양자화 단위 (픽셀 단위 리사이즈마다 캐시가 바뀌지 않도록)
+PREVIEW_MIN_LABEL_SIZE = 50  # 레이블이 이보다 작으면 크기가 정해질 때까지 미리보기를 미룸
+LOG_MAX_LINES = 5000    # 로그 창에 유지할 최대 줄 수 (넘으면 오래된 줄부터 삭제)
+SHUTDOWN_TIMEOUT_MS = 5000  # 크롤러 종료가 이 시간 안에 끝나지 않으면 창을 강제로 닫음
+
+# Tkinter에 안전한 모드로의 변환 대상 (목록에 없는 모드는 RGBA로 변환)
+_PREVIEW_MODE_TARGETS = {
+    "1": "L", "L": "RGB", "LA": "RGBA", "PA": "RGBA",
+    "I": "RGB", "I;16": "RGB", "F": "RGB",
+    "CMYK": "RGB", "YCbCr": "RGB", "LAB": "RGB", "HSV": "RGB",
+}
+
+def _preview_mode_target(img):
+    """img를 표시하기 위해 변환할 모드를 반환합니다. 변환이 필요 없으면 None."""
+    if img.mode in ("RGB", "RGBA"):
+        return None
+    if img.mode == "P":
+        return "RGBA" if "transparency" in img.info else "RGB"
+    return _PREVIEW_MODE_TARGETS.get(img.mode, "RGBA")
+
+def _fit_preview_image(img, box_w, box_h):
+    """PIL 이미지를 Tkinter에 안전한 모드로 바꾸고 (box_w, box_h) 안에 들어가도록 축소합니다."""
+    should_resize = box_w > 0 and box_h > 0
+    is_jpeg = img.format == "JPEG"  # convert() 이후에는 format 정보가 사라지므로 미리 저장
+
+    # JPEG는 디코딩 단계에서 1/2, 1/4, 1/8 크기로 바로 읽음 (전체 해상도 디코딩 생략)
+    if should_resize and is_jpeg:
+        img.draft("RGB", (box_w, box_h))
+    # draft() 이후에 디코딩해야 축소된 크기로 읽힘
+    img.load()
+
+    # PIL 모드 정리: Tkinter에 안전한 모드로 변환
+    target_mode = _preview_mode_target(img)
+    if target_mode:
+        img = img.convert(target_mode)
+
+    # 그 외 형식(PNG 등)은 정수 배율로 먼저 줄인 뒤 남은 배율만 리샘플링
+    if should_resize and not is_jpeg:
+        factor = max(1, min(img.width // box_w, img.height // box_h))
+        if factor > 1:
+            img = img.reduce(factor)
+
+    # 썸네일 생성 (Resampling 호환 처리)
+    # 미리 줄여서 남은 배율이 2배 이내면 BICUBIC으로 충분, 그보다 크면 LANCZOS 사용
+    if should_resize:
+        resampling_enum = getattr(Image, "Resampling", Image)
+        if max(img.width / box_w, img.height / box_h) <= 2:
+            resampling = resampling_enum.BICUBIC
+        else:
+            resampling = resampling_enum.LANCZOS
+        img.thumbnail((box_w, box_h), resampling)
+    return img
+
+def _decode_preview_image(fp, box_w, box_h):
+    """fp(경로 또는 파일 객체)를 디코딩해 (box_w, box_h)에 맞춘 이미지를 반환합니다. 파일은 바로 닫힙니다."""
+    with Image.open(fp) as src:
+        img = _fit_preview_image(src, box_w, box_h)
+        # 변환 없이 같은 객체면 with 블록이 닫은 뒤에도 쓸 수 있도록 복사
+        if img is src:
+            img = src.copy()
+    return img
+
+@functools.lru_cache(maxsize=4)
+def _load_preview_source(path, mtime, max_w, max_h):
+    """
+    파일을 한 번만 디코딩해 화면 크기(max_w, max_h) 이내로 줄인 원본을 반환합니다.
+    레이블은 화면보다 커질 수 없으므로 리사이즈 시에는 이 이미지에서 다시 축소만 하면 됩니다.
+    """
+    return _decode_preview_image(path, max_w, max_h)
+
+@functools.lru_cache(maxsize=PREVIEW_CACHE_SIZE)
+def _load_preview_image(path, mtime, box_w, box_h, max_w, max_h):
+    """
+    미리보기 크기로 줄인 이미지를 반환합니다.
+    mtime은 파일이 바뀌었을 때 캐시를 무효화하기 위한 키로만 사용됩니다.
+    """
+    # thumbnail()은 원본을 직접 수정하므로 캐시된 원본은 복사해서 사용
+    return _fit_preview_image(_load_preview_source(path, mtime, max_w, max_h).copy(), box_w, box_h)
+
+
 class CrawlerManager:
     """
     Runs a single PixaiCrawler instance on a dedicated background asyncio loop/thread.
@@ -336,6 +513,30 @@ class EntryWithPlaceholder(tk.Entry):
         return super().get()
 
 
+_MIT_LICENSE_TEXT = """\
+MIT License
+
+Copyright (c) 2024 [Copyright Holder]
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -348,10 +549,40 @@ class App(tk.Tk):
         # Model presets
         self.model_presets = []
         self.current_model_preset = None
+        self._preset_index = {}     # (model_name, model_version, frozenset(loras)) -> preset
+        self._preset_names_sorted = []  # model_presets와 같은 순서(이름순)의 이름 목록, bisect용
+        self._last_combo_values = ()    # 콤보박스에 마지막으로 설정한 프리셋 이름들
+
+        # 웹페이지의 현재 모델/LoRA 설정 캐시 (모델/LoRA 변경 시 무효화)
+        self._active_config_cache = None
+        self._active_config_dirty = True
+
+        # 이미 생성한 출력 폴더 (makedirs 중복 호출 방지)
+        self._ensured_dirs = set()
+        self._ensured_dirs_lock = threading.Lock()
+        # 생성 중 다음 작업을 미리 준비하는 백그라운드 워커
+        self._prep_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-prep")
+
+        # 모델 프리셋 지연 저장 (짧은 시간 내 여러 저장 요청을 하나로 합침)
+        self._presets_dirty = False
+        self._pending_save_after_id = None
+
+        # 결과 이미지 미리보기 예약 (연속 생성 시 마지막 이미지만 디코딩)
+        self._preview_after_id = None
+        self._preview_photo_cache = OrderedDict()  # (path, mtime, box_w, box_h) -> PhotoImage
+        self._current_preview_path = None
+        self._preview_resize_after_id = None
+        self._preview_label_size = (1, 1)   # <Configure>에서 갱신 (워커 스레드에서 winfo 호출 방지)
+        self._preview_token = None          # 가장 최근 미리보기 요청 식별자
+        self._closed = False
+        self._pending_preview = None        # 레이블 크기가 정해지기 전에 요청된 미리보기
+        self._preview_max_size = (self.winfo_screenwidth(), self.winfo_screenheight())
 
         # 이미지 체크박스 사용하지 않음. 내부 ttk.Checkbutton 사용.
         self.checkbox_vars = {}     # key -> BooleanVar
         self.preset_widgets = {}    # key -> widget frame
+        self._toggleable_widgets = []   # set_ui_state에서 활성/비활성화할 프리셋·부스터 위젯
+        self._ui_running = False
         self.checked_items = set()
         self.group_expanded_state = {}
         self.checked_keys = set()
@@ -487,6 +718,7 @@ class App(tk.Tk):
             child.destroy()
         self.checkbox_vars.clear()
         self.preset_widgets.clear()
+        self._toggleable_widgets = list(self.booster_checkboxes.values())
         self.checked_items.clear()
         self.clear_preset_preview()
 
@@ -535,6 +767,7 @@ class App(tk.Tk):
                                        command=lambda k=group_key: self._on_group_toggle(k),
                                        style="Preset.TCheckbutton")
                 gchk.pack(side=tk.LEFT, anchor='w')
+                self._toggleable_widgets.append(gchk)
 
                 if is_expanded:
                     child_container = tk.Frame(group_frame, bg=canvas_bg)
@@ -556,6 +789,7 @@ class App(tk.Tk):
                                                 command=lambda pk=p_key, gk=group_key: self._on_preset_toggle(pk, gk),
                                                 style="Preset.TCheckbutton")
                         pchk.pack(side=tk.LEFT, anchor='w')
+                        self._toggleable_widgets.append(pchk)
 
                         # 마우스 호버로 프리뷰 표시
                         pchk.bind("<Enter>", lambda e, prm=pprompt: self.show_preset_preview(prm))
@@ -580,6 +814,10 @@ class App(tk.Tk):
                             tooltip_text = "현재 프롬프트에 이 프리셋을 추가합니다."
                         
                         self.add_remove_tooltips[p_key] = Tooltip(add_remove_btn, tooltip_text) # Store tooltip instance
+                        self._toggleable_widgets.extend((overwrite_btn, add_remove_btn))
+        # 실행 중에 목록이 새로 그려진 경우 새 위젯도 비활성화
+        if self._ui_running:
+            self._set_toggleable_widgets_state('disabled')
         self.update_select_all_button_text()
 
     def _on_group_toggle(self, group_key):
@@ -693,66 +931,65 @@ class App(tk.Tk):
 
     def _gather_selected_presets_with_names(self):
         tasks = []
+        # (그룹, 프리셋) -> 프롬프트. 같은 이름이 여러 개면 기존처럼 마지막 그룹의 첫 프리셋을 사용
+        prompts = {}
+        for g in self.presets.get("groups", []):
+            group_prompts = {}
+            for p in g.get("presets", []):
+                group_prompts.setdefault(p.get("name"), p.get("prompt"))
+            for preset_name, prompt in group_prompts.items():
+                prompts[(g.get("name"), preset_name)] = prompt
         # self.checked_keys는 순서가 없으므로 key 정렬
         for key in sorted(list(self.checked_keys)):
             if not key.startswith("preset::"): continue
             
             parts = key.split("::", 2)
             _, group_name, preset_name = parts
-            prompt = None
-            for g in self.presets.get("groups", []):
-                if g.get("name") == group_name:
-                    for p in g.get("presets", []):
-                        if p.get("name") == preset_name:
-                            prompt = p.get("prompt"); break
+            prompt = prompts.get((group_name, preset_name))
             if prompt:
                 tasks.append((preset_name, prompt))
         return tasks
 
-    def _parse_lora_string(self, lora_str: str) -> list[dict]:
+    def _parse_lora_string(self, lora_str: str) -> tuple[Mapping, ...]:
         """Parses the LoRA string with optional weights (e.g., 'lora a:0.8, lora b')."""
-        loras_with_weights = []
-        if not lora_str:
-            return loras_with_weights
-        
-        lora_parts = [l.strip() for l in lora_str.split(',') if l.strip()]
-        for part in lora_parts:
-            if ':' in part:
-                name, _, weight_str = part.rpartition(':')
-                try:
-                    # Validate that weight is a float
-                    float(weight_str)
-                    loras_with_weights.append({'name': name.strip(), 'weight': weight_str.strip()})
-                except ValueError:
-                    # If weight is not a valid float, treat the whole thing as a name
-                    loras_with_weights.append({'name': part, 'weight': None})
-            else:
-                loras_with_weights.append({'name': part, 'weight': None})
-        return loras_with_weights
-    def find_trigger_words_for_model(self, model_name, model_version, lora_str):
-        """Finds a model preset and returns its trigger words."""
-        parsed_loras = self._parse_lora_string(lora_str)
-        lora_names = [l['name'] for l in parsed_loras]
-        sanitized_loras_input = sorted([re.sub(r'[\W_]+', '', name).lower() for name in lora_names])
+        return _parse_lora_cached(lora_str or '')
 
-        found_preset = None
+    def _make_model_preset_index_key(self, model_name, model_version, lora_str):
+        """Builds the lookup key used by the model preset index. LoRA weights are ignored."""
+        lora_names = [l['name'] for l in self._parse_lora_string(lora_str)]
+        return (model_name, model_version, frozenset(_sanitize(name) for name in lora_names))
+
+    def _rebuild_preset_index(self):
+        """Rebuilds the (model, version, LoRA set) -> preset index from self.model_presets."""
+        index = {}
         for preset in self.model_presets:
-            # The 'lora' field in the preset still contains the name:weight string
-            preset_loras_str = preset.get('lora', '')
-            parsed_preset_loras = self._parse_lora_string(preset_loras_str)
-            preset_lora_names = [l['name'] for l in parsed_preset_loras]
-            sanitized_loras_preset = sorted([re.sub(r'[\W_]+', '', name).lower() for name in preset_lora_names])
-
-            if (preset.get('model_name') == model_name and
-                preset.get('model_version') == model_version and
-                sanitized_loras_preset == sanitized_loras_input):
-                found_preset = preset
-                break
-        
+            key = self._make_model_preset_index_key(
+                preset.get('model_name'), preset.get('model_version'), preset.get('lora', ''))
+            # 기존 선형 탐색과 동일하게 먼저 나온 프리셋을 우선
+            index.setdefault(key, preset)
+        self._preset_index = index
+
+    def find_model_preset(self, model_name, model_version, lora_str):
+        """Returns the model preset matching the given configuration, or None."""
+        key = self._make_model_preset_index_key(model_name, model_version, lora_str)
+        return self._preset_index.get(key)
+
+    def find_trigger_words_for_model(self, model_name, model_version, lora_str):
+        """Finds a model preset and returns its trigger words."""
+        found_preset = self.find_model_preset(model_name, model_version, lora_str)
         if found_preset:
             return found_preset.get('trigger_words', '')
         return ''
 
+    def _read_active_config(self, headless):
+        """Reads the model/LoRA config from the page and caches it when the browser is headless."""
+        active_config = self.crawler_manager.run_get_active_config()
+        # 읽기 실패 결과는 캐시하지 않음
+        if headless and not str(active_config.get('model_name', '')).startswith('error_reading'):
+            self._active_config_cache = active_config
+            self._active_config_dirty = False
+        return active_config
+
     def execute_generation_task(self, tasks, model_name, model_version, lora_str, headless):
         total_tasks = len(tasks)
         if total_tasks > 0:
@@ -766,9 +1003,14 @@ class App(tk.Tk):
             target_loras = self._parse_lora_string(lora_str)
             lora_names = [l['name'] for l in target_loras]
 
-            # --- 2. Get Active Config from Page (for the first task) ---
-            print("웹페이지의 현재 설정을 확인합니다...")
-            active_config = self.crawler_manager.run_get_active_config()
+            # --- 2. Get Active Config from Page (cached until model/LoRA changes) ---
+            # 브라우저 창이 보이면 사용자가 페이지에서 직접 모델/LoRA를 바꿀 수 있으므로 캐시를 쓰지 않음
+            if not headless or self._active_config_dirty or self._active_config_cache is None:
+                print("웹페이지의 현재 설정을 확인합니다...")
+                active_config = self._read_active_config(headless)
+            else:
+                print("캐시된 웹페이지 설정을 사용합니다.")
+                active_config = self._active_config_cache
             
             # --- 3. Compare and Set Model/LoRAs if necessary ---
             active_lora_names = [l['name'] for l in active_config.get('loras', [])]
@@ -777,6 +1019,8 @@ class App(tk.Tk):
             lora_names_match = sorted(lora_names) == sorted(active_lora_names)
             
             new_trigger_words = None
+            if not (model_match and lora_names_match):
+                self._invalidate_active_config()
 
             if not model_match:
                 print(f"모델 설정이 다릅니다. 목표: {target_model_name} (v: {target_model_version}) / 현재: {active_config.get('model_name')} (v: {active_config.get('model_version')})")
@@ -796,6 +1040,11 @@ class App(tk.Tk):
             else:
                 print("페이지에 이미 올바른 모델/LoRA가 설정되어 있습니다.")
 
+            if not (model_match and lora_names_match) and new_trigger_words is not False and headless:
+                # set_loras는 비슷한 이름이나 첫 검색 결과를 고를 수 있으므로, 목표값이 아닌 설정 후 페이지의 실제 값을 캐시
+                # (set_loras가 False를 반환하면 실패한 것이므로 캐시하지 않고 다음 실행에서 페이지를 다시 읽음)
+                self._read_active_config(headless)
+
             if new_trigger_words is not None:
                 self.update_model_preset_with_trigger_words(target_model_name, target_model_version, lora_str, new_trigger_words)
 
@@ -803,31 +1052,22 @@ class App(tk.Tk):
             trigger_words = self.find_trigger_words_for_model(target_model_name, target_model_version, lora_str)
 
             # Create organized output directory
-            lora_folder_name = '_'.join(sorted([re.sub(r'[\W_]+', '', name).lower() for name in lora_names])) or '-'
-            model_folder_name = re.sub(r'[\W_]+', '', target_model_name).lower() or '-'
-            base_output_dir = os.path.join("generated", f"{model_folder_name}_{lora_folder_name}")
-
-            all_generated_files = []
-            for i, (name, prompt) in enumerate(tasks):
-                print(f"\n--- 작업 {i+1}/{len(tasks)}: {name} ---")
+            lora_folder_name = '_'.join(sorted([_sanitize(name) for name in lora_names])) or '-'
+            model_folder_name = _sanitize(target_model_name) or '-'
+            base_output_dir = os.path.normpath(os.path.join("generated", f"{model_folder_name}_{lora_folder_name}"))
 
-                # Determine final output directory, including preset name if applicable
-                if name != "current_prompt_context":
-                    preset_folder_name = re.sub(r'[\W_]+', '', name).lower()
-                    output_dir = os.path.join(base_output_dir, preset_folder_name)
-                else:
-                    output_dir = base_output_dir
-                os.makedirs(output_dir, exist_ok=True)
+            # 트리거 워드는 배치 내에서 변하지 않으므로 접두어를 미리 만들어 둠
+            tw_prefix = f"{trigger_words}, " if trigger_words else ""
 
-                final_prompt = f"{trigger_words}, {prompt}" if trigger_words and trigger_words not in prompt else prompt
-                
-                # Correctly call run_image_macro with output_name
-                image_paths = self.run_image_macro(prompt=final_prompt, output_name=name, output_dir=output_dir)
-                
+            all_generated_files = []
+            # 배치 전체를 하나의 크롤러 코루틴으로 실행하고 결과를 순서대로 받음
+            prepared_tasks = self._iter_prepared_tasks(tasks, base_output_dir, tw_prefix, trigger_words)
+            results = self.run_image_macro_stream(prepared_tasks)
+            for i, ((name, _), image_paths) in enumerate(zip(tasks, results)):
                 if image_paths:
                     print(f"성공: {len(image_paths)}개 이미지 저장됨")
                     all_generated_files.extend(image_paths)
-                    self.after(100, self.load_generated_image, image_paths[-1])
+                    self._schedule_preview(image_paths[-1])
                 else:
                     print(f"작업 '{name}'에 대한 이미지 생성 실패.")
                 
@@ -839,12 +1079,63 @@ class App(tk.Tk):
                  self.after(100, lambda: messagebox.showinfo("생성 완료", f"총 {len(all_generated_files)}개의 이미지가 생성되었습니다."))
 
         except Exception as e:
+            self._invalidate_active_config()
             print(f"생성 작업 중 오류 발생: {e}")
             self.after(100, lambda e=e: messagebox.showerror("실행 오류", f"매크로 실행 중 오류가 발생했습니다:\n{e}"))
         finally:
             if total_tasks > 0:
                 self.after(0, lambda: self.progress_bar.grid_remove())
 
+    async def _iter_prepared_tasks(self, tasks, base_output_dir, tw_prefix, trigger_words):
+        """
+        Async generator yielding (final_prompt, output_dir) for each task. The next task is prepared on
+        self._prep_pool while the current one is generating; waiting for it is awaited, not blocking,
+        so the crawler loop that consumes this generator keeps running.
+        """
+        total = len(tasks)
+        prep_future = None
+        if tasks:
+            prep_future = self._prep_pool.submit(
+                self._prepare_generation_task, tasks[0], base_output_dir, tw_prefix, trigger_words)
+        for i, (name, _) in enumerate(tasks):
+            output_dir, final_prompt = await asyncio.wrap_future(prep_future)
+            if i + 1 < total:
+                prep_future = self._prep_pool.submit(
+                    self._prepare_generation_task, tasks[i + 1], base_output_dir, tw_prefix, trigger_words)
+            print(f"\n--- 작업 {i+1}/{total}: {name} ---")
+            yield final_prompt, output_dir
+
+    def _prepare_generation_task(self, task, base_output_dir, tw_prefix, trigger_words):
+        """Creates the task's output directory and builds its final prompt. Returns (output_dir, final_prompt)."""
+        name, prompt = task
+
+        # Determine final output directory, including preset name if applicable
+        # base_output_dir은 이미 정규화되어 있고 폴더명은 영숫자뿐이므로 단순 연결로 충분
+        if name != "current_prompt_context":
+            output_dir = f"{base_output_dir}{os.sep}{_sanitize(name)}"
+        else:
+            output_dir = base_output_dir
+        self._ensure_dir(output_dir)
+
+        if tw_prefix and not prompt.startswith(tw_prefix) and trigger_words not in prompt:
+            final_prompt = tw_prefix + prompt
+        else:
+            final_prompt = prompt
+        return output_dir, final_prompt
+
+    def _ensure_dir(self, path):
+        """os.makedirs(path, exist_ok=True), skipped for directories already created this session."""
+        p = os.path.normpath(path)
+        with self._ensured_dirs_lock:
+            if p in self._ensured_dirs:
+                return
+            os.makedirs(p, exist_ok=True)
+            self._ensured_dirs.add(p)
+
+    def _invalidate_active_config(self):
+        """Forces the next generation run to re-read the model/LoRA config from the page."""
+        self._active_config_dirty = True
+
     def start_batch_macro(self):
         tasks = self._gather_selected_presets_with_names()
         if not tasks:
@@ -883,12 +1174,9 @@ class App(tk.Tk):
           - None on failure
         Note: 더 이상 output_dir 내에서 파일을 골라 이동하거나 이름을 변경하지 않습니다.
         """
-        if self.crawler_manager.start_exception:
-            raise RuntimeError(f"Crawler failed to start: {self.crawler_manager.start_exception}")
-        if not self.crawler_manager.ready.is_set() or not self.crawler_manager.crawler or not self.crawler_manager.loop:
-            raise RuntimeError("Crawler is not ready. Run setup or wait for crawler to initialize.")
+        self._require_crawler_ready()
 
-        os.makedirs(output_dir, exist_ok=True)
+        self._ensure_dir(output_dir)
         coro = self.crawler_manager.crawler.image_gen_macro(prompt_text=prompt, output_dir=output_dir)
         future = asyncio.run_coroutine_threadsafe(coro, self.crawler_manager.loop)
         try:
@@ -897,6 +1185,51 @@ class App(tk.Tk):
             future.cancel()
             raise
 
+        return self._normalize_image_result(_res)
+
+    def run_image_macro_stream(self, tasks, timeout: int = 600):
+        """
+        Streaming variant of run_image_macro for a whole batch.
+        tasks: async iterable of (prompt, output_dir), consumed on the crawler loop.
+        Schedules a single crawler.image_gen_macro_batch coroutine and yields one result per task,
+        in order, in the same shape as run_image_macro. `timeout` applies to each task.
+        """
+        self._require_crawler_ready()
+
+        results = queue.Queue()
+
+        async def _drain_into_queue():
+            try:
+                async for res in self.crawler_manager.crawler.image_gen_macro_batch(tasks):
+                    results.put(("result", res))
+            except Exception as e:
+                results.put(("error", e))
+            finally:
+                results.put(("done", None))
+
+        future = asyncio.run_coroutine_threadsafe(_drain_into_queue(), self.crawler_manager.loop)
+        try:
+            while True:
+                try:
+                    kind, value = results.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"이미지 생성이 {timeout}초 안에 끝나지 않았습니다.")
+                if kind == "done":
+                    return
+                if kind == "error":
+                    raise value
+                yield self._normalize_image_result(value)
+        finally:
+            if not future.done():
+                future.cancel()
+
+    def _require_crawler_ready(self):
+        if self.crawler_manager.start_exception:
+            raise RuntimeError(f"Crawler failed to start: {self.crawler_manager.start_exception}")
+        if not self.crawler_manager.ready.is_set() or not self.crawler_manager.crawler or not self.crawler_manager.loop:
+            raise RuntimeError("Crawler is not ready. Run setup or wait for crawler to initialize.")
+
+    def _normalize_image_result(self, _res) -> str | list | None:
         if not _res:
             return None
 
@@ -939,61 +1272,138 @@ class App(tk.Tk):
                 else:
                     last_image = image_result
                 # UI에 로드
-                self.after(100, self.load_generated_image, last_image)
+                self._schedule_preview(last_image)
         print("\n일괄 작업을 모두 완료했습니다.")
 
     def run_async_task(self, task_func, *args):
         def task_wrapper():
             # UI 상태 토글은 메인스레드에서 안전하게 수행되도록 after 사용
             self.after(0, lambda: self.set_ui_state(True))
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
             try:
                 if asyncio.iscoroutinefunction(task_func):
-                    result = loop.run_until_complete(task_func(*args))
+                    result = asyncio.run(task_func(*args))
                     # execute_macro_batch 자체가 execute하며 이미 이미지를 로드함
                     if task_func != self.execute_macro_batch and result:
-                        self.after(100, self.load_generated_image, result)
+                        self._schedule_preview(result)
                 else:
                     task_func(*args)
             except Exception as e:
                 print(f"작업 중 오류 발생: {e}")
             finally:
                 self.after(0, lambda: self.set_ui_state(False))
-                loop.close()
+        # 동기 작업은 종료 시 프로세스를 붙잡지 않도록 daemon 스레드에서 실행
         thread = threading.Thread(target=task_wrapper, daemon=True)
         thread.start()
 
     def load_presets(self):
         if not os.path.exists(PROMPT_FILE):
             return {"groups": [{"name": "기본", "presets": []}]}
-        with open(PROMPT_FILE, 'r', encoding='utf-8') as f:
-            try: return json.load(f)
-            except json.JSONDecodeError: return {"groups": [{"name": "기본", "presets": []}]}
+        try: return load_json_file(PROMPT_FILE)
+        except json.JSONDecodeError: return {"groups": [{"name": "기본", "presets": []}]}
 
     def save_presets(self):
-        with open(PROMPT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.presets, f, ensure_ascii=False, indent=4)
+        atomic_write_json(PROMPT_FILE, self.presets)
 
     def load_model_presets(self):
         if not os.path.exists(MODEL_PRESETS_FILE):
             self.model_presets = []
         else:
-            with open(MODEL_PRESETS_FILE, 'r', encoding='utf-8') as f:
-                try:
-                    self.model_presets = json.load(f)
-                except json.JSONDecodeError:
-                    self.model_presets = []
+            try:
+                self.model_presets = load_json_file(MODEL_PRESETS_FILE)
+            except json.JSONDecodeError:
+                self.model_presets = []
+        # 이름순 정렬을 유지하고 이후에는 bisect로 삽입/삭제
+        self.model_presets.sort(key=lambda p: p['name'])
+        self._preset_names_sorted = [p['name'] for p in self.model_presets]
+        if not self._load_preset_index_cache():
+            self._rebuild_preset_index()
         self.populate_model_preset_combobox()
 
     def save_model_presets(self):
-        with open(MODEL_PRESETS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.model_presets, f, ensure_ascii=False, indent=4)
+        atomic_write_json(MODEL_PRESETS_FILE, self.model_presets)
+        self._rebuild_preset_index()
+        self._save_preset_index_cache()
+
+    @staticmethod
+    def _model_presets_file_signature():
+        """(st_mtime_ns, st_size) of MODEL_PRESETS_FILE, used to tie the index sidecar to one exact JSON file."""
+        st = os.stat(MODEL_PRESETS_FILE)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _save_preset_index_cache(self):
+        """Writes the preset index as {key: preset name} next to MODEL_PRESETS_FILE."""
+        name_index = {key: preset['name'] for key, preset in self._preset_index.items()}
+        try:
+            # JSON 파일의 mtime/크기를 함께 저장해, 파일이 바뀌면 (더 오래된 mtime으로 복원된 경우 포함) 인덱스를 버림
+            payload = {'format': MODEL_PRESETS_INDEX_FORMAT, 'source': self._model_presets_file_signature(), 'index': name_index}
+            atomic_write_bytes(MODEL_PRESETS_INDEX_FILE, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError as e:
+            print(f"모델 프리셋 인덱스 저장 실패: {e}", file=sys.stderr)
+
+    def _load_preset_index_cache(self) -> bool:
+        """
+        Restores self._preset_index from the sidecar written by _save_preset_index_cache.
+        Returns False if the sidecar is missing or unreadable, was written with a different
+        MODEL_PRESETS_INDEX_FORMAT or for a different MODEL_PRESETS_FILE (mtime or size differ),
+        or doesn't match the presets.
+        """
+        # 캐시 때문에 앱 시작이 실패하면 안 되므로 손상된 파일에서 나오는 모든 예외는 재생성으로 처리
+        try:
+            with open(MODEL_PRESETS_INDEX_FILE, 'rb') as f:
+                payload = pickle.load(f)
+            source = self._model_presets_file_signature()
+            if (not isinstance(payload, dict)
+                    or payload.get('format') != MODEL_PRESETS_INDEX_FORMAT
+                    or payload.get('source') != source):
+                return False
+            name_index = payload.get('index')
+            if not isinstance(name_index, dict):
+                return False
+
+            presets_by_name = {p['name']: p for p in self.model_presets}
+            index = {}
+            for key, name in name_index.items():
+                preset = presets_by_name.get(name)
+                if preset is None:
+                    return False
+                index[key] = preset
+        except Exception:
+            return False
+        self._preset_index = index
+        return True
+
+    def _schedule_presets_save(self, delay_ms=500):
+        """Marks model presets dirty and saves them once on the main thread after delay_ms.
+        Safe to call from worker threads; repeated calls within the delay coalesce into one write."""
+        self._presets_dirty = True
+        self.after(0, self._arm_presets_save_timer, delay_ms)
+
+    def _arm_presets_save_timer(self, delay_ms):
+        if self._pending_save_after_id is not None:
+            self.after_cancel(self._pending_save_after_id)
+        self._pending_save_after_id = self.after(delay_ms, self._flush_presets_save)
+
+    def _flush_presets_save(self):
+        if self._pending_save_after_id is not None:
+            self.after_cancel(self._pending_save_after_id)
+            self._pending_save_after_id = None
+        if not self._presets_dirty:
+            return
+        self._presets_dirty = False
+        try:
+            self.save_model_presets()
+        except Exception as e:
+            print(f"모델 프리셋 저장 중 오류 발생: {e}")
 
     def populate_model_preset_combobox(self):
-        preset_names = [p['name'] for p in self.model_presets]
+        preset_names = tuple(p['name'] for p in self.model_presets)
+        # 이름 목록이 그대로면 콤보박스를 건드리지 않음
+        if preset_names == self._last_combo_values:
+            return
+        self._last_combo_values = preset_names
         self.model_preset_combo['values'] = preset_names
-        self.model_preset_combo.set('')
+        if self.model_preset_combo.get():
+            self.model_preset_combo.set('')
 
     def on_model_preset_select(self, event=None):
         selected_name = self.model_preset_combo.get()
@@ -1005,6 +1415,7 @@ class App(tk.Tk):
         new_preset = next((p for p in self.model_presets if p['name'] == selected_name), None)
         if not new_preset:
             return
+        self._invalidate_active_config()
 
         # Update model/lora entries
         self.model_name_entry.set_text(new_preset.get("model_name", ""))
@@ -1014,6 +1425,9 @@ class App(tk.Tk):
         # Get old and new trigger words
         old_triggers = self.current_model_preset.get("trigger_words", "") if self.current_model_preset else ""
         new_triggers = new_preset.get("trigger_words", "")
+        # LoRA 검색 실패 시 trigger_words가 False/None으로 저장될 수 있음
+        old_triggers = old_triggers or ""
+        new_triggers = new_triggers or ""
 
         # If triggers are the same, do nothing to the prompt
         if old_triggers == new_triggers:
@@ -1024,17 +1438,19 @@ class App(tk.Tk):
         current_prompt = self.prompt_entry.get()
         
         # Tokenize and process
-        prompt_tokens = [t.strip() for t in current_prompt.split(',') if t.strip()]
-        old_trigger_tokens = [t.strip() for t in old_triggers.split(',') if t.strip()] if old_triggers else []
-        
-        # Remove old trigger words from the prompt tokens
-        if old_trigger_tokens:
-            prompt_tokens = [t for t in prompt_tokens if t not in old_trigger_tokens]
+        old_trigger_set = {t.strip() for t in old_triggers.split(',') if t.strip()}
+        new_trigger_tokens = [t.strip() for t in new_triggers.split(',') if t.strip()]
+
+        # Prepend new trigger words, then keep prompt tokens that are neither
+        # old trigger words nor duplicates (single pass, set membership)
+        final_tokens = list(new_trigger_tokens)
+        seen = set(new_trigger_tokens)
+        for t in (x.strip() for x in current_prompt.split(',')):
+            if not t or t in seen or t in old_trigger_set:
+                continue
+            final_tokens.append(t)
+            seen.add(t)
 
-        # Prepend new trigger words (and avoid duplicates)
-        new_trigger_tokens = [t.strip() for t in new_triggers.split(',') if t.strip()] if new_triggers else []
-        final_tokens = new_trigger_tokens + [t for t in prompt_tokens if t not in new_trigger_tokens]
-        
         self.prompt_entry.set_text(', '.join(final_tokens))
 
         # Update current preset for the next change
@@ -1098,14 +1514,16 @@ class App(tk.Tk):
             preset_to_update = next((p for p in self.model_presets if p['name'] == new_name), None)
             if not preset_to_update:
                 preset_to_update = {"name": new_name}
-                self.model_presets.append(preset_to_update)
+                # 이름순 위치에 삽입 (수정 시에는 이름이 바뀌지 않으므로 재배치 불필요)
+                idx = bisect.bisect_left(self._preset_names_sorted, new_name)
+                self._preset_names_sorted.insert(idx, new_name)
+                self.model_presets.insert(idx, preset_to_update)
 
             preset_to_update['model_name'] = model_name_entry.get().strip()
             preset_to_update['model_version'] = model_version_entry.get().strip()
             preset_to_update['lora'] = lora_entry.get().strip()
             preset_to_update['trigger_words'] = trigger_words_text.get("1.0", tk.END).strip()
 
-            self.model_presets.sort(key=lambda p: p['name'])
             self.save_model_presets()
             self.populate_model_preset_combobox()
             self.model_preset_combo.set(new_name)
@@ -1150,33 +1568,21 @@ class App(tk.Tk):
         if not messagebox.askyesno("삭제 확인", f"'{selected_name}' 프리셋을 삭제하시겠습니까?", parent=self):
             return
 
-        self.model_presets = [p for p in self.model_presets if p['name'] != selected_name]
+        idx = bisect.bisect_left(self._preset_names_sorted, selected_name)
+        if idx < len(self._preset_names_sorted) and self._preset_names_sorted[idx] == selected_name:
+            self._preset_names_sorted.pop(idx)
+            self.model_presets.pop(idx)
         self.save_model_presets()
         self.populate_model_preset_combobox()
 
     def update_model_preset_with_trigger_words(self, model_name, model_version, lora_str, trigger_words):
         """Finds a model preset matching the configuration and updates its trigger_words."""
-        parsed_loras = self._parse_lora_string(lora_str)
-        lora_names = [l['name'] for l in parsed_loras]
-        sanitized_loras_input = sorted([re.sub(r'[\W_]+', '', name).lower() for name in lora_names])
+        found_preset = self.find_model_preset(model_name, model_version, lora_str)
 
-        found_preset = None
-        for preset in self.model_presets:
-            preset_loras_str = preset.get('lora', '')
-            parsed_preset_loras = self._parse_lora_string(preset_loras_str)
-            preset_lora_names = [l['name'] for l in parsed_preset_loras]
-            sanitized_loras_preset = sorted([re.sub(r'[\W_]+', '', name).lower() for name in preset_lora_names])
-
-            if (preset.get('model_name') == model_name and
-                preset.get('model_version') == model_version and
-                sanitized_loras_preset == sanitized_loras_input):
-                found_preset = preset
-                break
-        
         if found_preset:
             if found_preset.get('trigger_words') != trigger_words:
                 found_preset['trigger_words'] = trigger_words
-                self.save_model_presets()
+                self._schedule_presets_save()
         else:
             print("트리거 워드를 저장할 일치하는 모델 프리셋을 찾지 못했습니다.")
 
@@ -1280,15 +1686,44 @@ class App(tk.Tk):
 
     def redirect_logging(self):
         class TextHandler:
-            def __init__(self, text_widget, app): self.text_widget, self.app = text_widget, app
-            def write(self, s): self.app.after(0, self.update_text, s)
+            """Buffers writes and flushes them to the log widget at most once per FLUSH_MS."""
+            FLUSH_MS = 100
+            def __init__(self, text_widget, app):
+                self.text_widget, self.app = text_widget, app
+                self._buf = []; self._lock = threading.Lock(); self._scheduled = False
+            def write(self, s):
+                with self._lock:
+                    self._buf.append(s)
+                    if self._scheduled: return
+                    self._scheduled = True
+                try:
+                    self.app.after(self.FLUSH_MS, self._flush)
+                except (RuntimeError, tk.TclError):
+                    # 메인 루프 밖이거나 창이 닫힌 경우: 다음 write에서 다시 예약할 수 있도록 되돌림
+                    with self._lock: self._scheduled = False
+            def _flush(self):
+                with self._lock:
+                    # 위젯 줄 수는 update_text에서 제한하므로 버퍼는 조각을 버리지 않고 매번 전부 비움
+                    data = ''.join(self._buf); self._buf.clear(); self._scheduled = False
+                if data: self.update_text(data)
             def update_text(self, s):
                 self.text_widget.configure(state='normal'); self.text_widget.insert(tk.END, s)
+                # LOG_MAX_LINES를 넘는 만큼 오래된 줄 삭제
+                excess = int(self.text_widget.index('end-1c').split('.')[0]) - LOG_MAX_LINES
+                if excess > 0: self.text_widget.delete('1.0', f'{excess + 1}.0')
                 self.text_widget.see(tk.END); self.text_widget.configure(state='disabled')
             def flush(self): pass
         import sys; sys.stdout = TextHandler(self.log_text, self); sys.stderr = TextHandler(self.log_text, self)
 
+    def _set_toggleable_widgets_state(self, state):
+        for widget in self._toggleable_widgets:
+            try:
+                widget.config(state=state)
+            except Exception:
+                pass
+
     def set_ui_state(self, is_running):
+        self._ui_running = is_running
         state = 'disabled' if is_running else 'normal'
         self.run_button.config(state=state)
         self.prompt_entry.config(state=state)
@@ -1308,25 +1743,14 @@ class App(tk.Tk):
             self.headless_check.config(state=state)
         except Exception:
             pass
-        # disable/enable all checkbuttons in preset widgets
-        for frame in self.preset_widgets.values():
-            for child in frame.winfo_children():
-                try:
-                    child.config(state=state)
-                except Exception:
-                    pass
         # also the search entry and radio buttons
         try:
             self.search_entry.config(state=state)
         except Exception:
             pass
 
-        # Booster checkboxes
-        for chk in self.booster_checkboxes.values():
-            try:
-                chk.config(state=state)
-            except Exception:
-                pass
+        # Preset checkbuttons/buttons and booster checkboxes (collected in filter_presets)
+        self._set_toggleable_widgets_state(state)
 
     def setup_main_controls_ui(self, parent_frame):
         control_frame = ttk.LabelFrame(parent_frame, text="명령어", padding="10")
@@ -1394,7 +1818,7 @@ class App(tk.Tk):
                 booster_frame,
                 text=booster_name,
                 variable=var,
-                command=lambda name=booster_name, v=var: self.on_booster_toggle(name, v)
+                command=functools.partial(self.on_booster_toggle, booster_name, var)
             )
             chk.pack(side=tk.LEFT, padx=5)
             self.booster_checkboxes[booster_name] = chk
@@ -1444,6 +1868,7 @@ class App(tk.Tk):
         image_frame.grid(row=0, column=1, sticky="nsew", padx=(5, 0))
         self.image_label = ttk.Label(image_frame, text="실행 시 여기에 이미지가 표시됩니다.", anchor="center")
         self.image_label.pack(fill=tk.BOTH, expand=True)
+        self.image_label.bind("<Configure>", self._on_image_label_configure)
 
         self.style.configure("green.Horizontal.TProgressbar", background='#4CAF50') # A nice green
         self.progress_bar = ttk.Progressbar(output_frame, mode='determinate', style="green.Horizontal.TProgressbar")
@@ -1452,68 +1877,136 @@ class App(tk.Tk):
 
 
 
-    def load_generated_image(self, image_path):
+    def _schedule_preview(self, image_path, delay_ms=100):
+        """Schedules load_generated_image_async, replacing any preview that hasn't been shown yet.
+        Safe to call from worker threads."""
+        self.after(0, self._arm_preview, image_path, delay_ms)
+
+    def _arm_preview(self, image_path, delay_ms):
+        if self._preview_after_id is not None:
+            self.after_cancel(self._preview_after_id)
+        self._preview_after_id = self.after(delay_ms, self._do_preview, image_path)
+
+    def _do_preview(self, image_path):
+        self._preview_after_id = None
+        self.load_generated_image_async(image_path)
+
+    def load_generated_image_async(self, image_path):
         """
         image_path: str | Path | list[str|Path] | bytes | file-like
         - list이면 마지막 항목을 사용합니다.
         - bytes or file-like이면 메모리에서 읽습니다.
+        디코딩은 워커 스레드에서 하고 표시만 메인 스레드에서 합니다. 메인 스레드에서 호출하세요.
         """
-        # 빈 값 처리
-        if not image_path:
-            self.image_label.config(text="이미지를 찾을 수 없습니다.")
+        if self._defer_preview_until_sized(image_path):
             return
+        self._preview_token = token = object()
+        box_w, box_h = self._preview_box_size()
+        threading.Thread(target=self._decode_and_display, args=(image_path, box_w, box_h, token), daemon=True).start()
 
+    def _decode_and_display(self, image_path, box_w, box_h, token):
+        """Worker-thread half of load_generated_image_async: decodes, then hands the image to the main thread."""
+        try:
+            img, cache_key = self._decode_to_pil(image_path, box_w, box_h)
+        except FileNotFoundError:
+            self.after(0, lambda: self.image_label.config(text="이미지를 찾을 수 없습니다."))
+            return
+        except Exception as e:
+            self.after(0, lambda e=e: self.image_label.config(text=f"이미지 로드 실패:\n{e}"))
+            return
+        self.after(0, self._display_pil, img, cache_key, token)
+
+    def _decode_to_pil(self, image_path, box_w, box_h):
+        """
+        image_path를 디코딩하여 (box_w, box_h)에 맞춘 PIL 이미지와 PhotoImage 캐시 키를 반환합니다.
+        Tk를 사용하지 않으므로 워커 스레드에서 호출해도 됩니다.
+        파일 경로가 아니면 캐시 키는 None이며, 이미지가 없으면 FileNotFoundError를 발생시킵니다.
+        """
         # 리스트/튜플 처리: 마지막 항목 선택
         if isinstance(image_path, (list, tuple)):
-            if not image_path:
-                self.image_label.config(text="이미지를 찾을 수 없습니다.")
-                return
-            path = image_path[-1]
+            image_path = image_path[-1] if image_path else None
+        # 빈 값 처리
+        if not image_path:
+            raise FileNotFoundError("이미지 경로가 비어 있습니다.")
+
+        # bytes 또는 file-like이면 스트림으로 처리 (캐시하지 않음)
+        if isinstance(image_path, (bytes, bytearray)):
+            return _decode_preview_image(io.BytesIO(image_path), box_w, box_h), None
+        if hasattr(image_path, "read"):
+            return _decode_preview_image(image_path, box_w, box_h), None
+
+        # 문자열/Path이면 절대경로로 변환 후 파일 존재 확인
+        path = os.path.abspath(str(image_path))
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        mtime = os.path.getmtime(path)
+        return _load_preview_image(path, mtime, box_w, box_h, *self._preview_max_size), (path, mtime, box_w, box_h)
+
+    def _display_pil(self, img, cache_key=None, token=None):
+        """Shows a decoded image in the preview label. Main thread only."""
+        # 더 최근에 요청된 미리보기가 있으면 무시
+        if token is not self._preview_token:
+            return
+        # 같은 파일/크기면 캐시된 PhotoImage 사용
+        photo = self._preview_photo_cache.get(cache_key) if cache_key else None
+        if photo is None:
+            photo = ImageTk.PhotoImage(img)
+            if cache_key:
+                self._preview_photo_cache[cache_key] = photo
+                if len(self._preview_photo_cache) > PREVIEW_CACHE_SIZE:
+                    self._preview_photo_cache.popitem(last=False)
         else:
-            path = image_path
-
-        import io
-        try:
-            # bytes 또는 file-like이면 스트림으로 처리
-            if isinstance(path, (bytes, bytearray)):
-                stream = io.BytesIO(path)
-                img = Image.open(stream)
-            elif hasattr(path, "read"):
-                img = Image.open(path)
-            else:
-                # 문자열/Path이면 절대경로로 변환 후 파일 존재 확인
-                path = os.path.abspath(str(path))
-                if not os.path.exists(path):
-                    self.image_label.config(text="이미지를 찾을 수 없습니다.")
-                    return
-                img = Image.open(path)
-
-            # PIL 모드 정리: Tkinter에 안전한 모드로 변환
-            if img.mode not in ("RGB", "RGBA"):
-                try:
-                    img = img.convert("RGB")
-                except Exception:
-                    img = img.convert("RGBA")
+            self._preview_photo_cache.move_to_end(cache_key)
+        self._current_preview_path = cache_key[0] if cache_key else None
 
-            # 레이블 크기 얻기 (윈도우가 아직 그려지지 않았을 수 있으므로 최소값 보장)
-            lbl_w = max(2, self.image_label.winfo_width())
-            lbl_h = max(2, self.image_label.winfo_height())
+        self.image_label.config(image=photo, text="")
+        self.image_label.image = photo
 
-            # 썸네일 생성 (Resampling 호환 처리)
-            resampling = getattr(Image, "Resampling", Image).LANCZOS if hasattr(Image, "LANCZOS") else Image.NEAREST
-            if lbl_w > 20 and lbl_h > 20:
-                img.thumbnail((lbl_w - 20, lbl_h - 20), resampling)
-
-            photo = ImageTk.PhotoImage(img)
-            self.image_label.config(image=photo, text="")
-            self.image_label.image = photo
+    def _defer_preview_until_sized(self, image_path):
+        """
+        레이블이 아직 배치되지 않아 PREVIEW_MIN_LABEL_SIZE보다 작으면 요청을 보관하고 True를 반환합니다.
+        보관된 요청은 <Configure>에서 크기가 정해지면 다시 실행됩니다.
+        """
+        if min(self._preview_label_size) >= PREVIEW_MIN_LABEL_SIZE:
+            self._pending_preview = None
+            return False
+        self._pending_preview = image_path
+        return True
 
-        except Exception as e:
-            self.image_label.config(text=f"이미지 로드 실패:\n{e}")
+    def _preview_box_size(self):
+        """
+        Thumbnail bounds for the preview label, quantized to PREVIEW_SIZE_STEP. (0, 0) means no resize.
+        Uses the size recorded from <Configure> events, so it is safe to call from worker threads.
+        """
+        # 윈도우가 아직 그려지지 않았을 수 있으므로 최소값 보장
+        lbl_w = max(2, self._preview_label_size[0])
+        lbl_h = max(2, self._preview_label_size[1])
+        lbl_w -= lbl_w % PREVIEW_SIZE_STEP
+        lbl_h -= lbl_h % PREVIEW_SIZE_STEP
+        if lbl_w > 20 and lbl_h > 20:
+            return lbl_w - 20, lbl_h - 20
+        return 0, 0
+
+    def _on_image_label_configure(self, event):
+        self._preview_label_size = (event.width, event.height)
+        # 리사이즈 이벤트가 연속으로 들어와도 마지막 한 번만 다시 그림
+        if self._current_preview_path is None and self._pending_preview is None:
+            return
+        if self._preview_resize_after_id is not None:
+            self.after_cancel(self._preview_resize_after_id)
+        self._preview_resize_after_id = self.after(150, self._reload_current_preview)
+
+    def _reload_current_preview(self):
+        self._preview_resize_after_id = None
+        pending, self._pending_preview = self._pending_preview, None
+        if pending is not None:
+            self.load_generated_image_async(pending)
+        elif self._current_preview_path:
+            self.load_generated_image_async(self._current_preview_path)
 
     def _tokenize_prompt(self, prompt_str):
         if not prompt_str: return []
-        return [p.strip() for p in prompt_str.split(',') if p.strip()]
+        return list(_tokenize_prompt_cached(prompt_str))
 
     def _join_tokens(self, tokens):
         return ', '.join(tokens)
@@ -1552,16 +2045,16 @@ class App(tk.Tk):
             messagebox.showinfo("프롬프트 검사", "현재 프롬프트가 비어 있습니다.", parent=self)
             return
 
-        current_tokens = set(self._tokenize_prompt(current_prompt_text))
+        current_tokens = _prompt_token_set_cached(current_prompt_text)
         applied_presets = []
 
         for group in self.presets.get("groups", []):
             for preset in group.get("presets", []):
-                preset_tokens = self._tokenize_prompt(preset.get("prompt", ""))
+                preset_tokens = _prompt_token_set_cached(preset.get("prompt") or "")
                 if not preset_tokens:
                     continue
                 
-                if all(token in current_tokens for token in preset_tokens):
+                if preset_tokens <= current_tokens:
                     applied_presets.append(f"- {group.get('name')} / {preset.get('name')}")
 
         if not applied_presets:
@@ -1571,13 +2064,7 @@ class App(tk.Tk):
             messagebox.showinfo("프롬프트 검사", message, parent=self)
 
     def _unique_preserve_order(self, items):
-        seen = set()
-        out = []
-        for it in items:
-            if it not in seen:
-                seen.add(it)
-                out.append(it)
-        return out
+        return list(dict.fromkeys(items))
 
     def open_merge_each_dialog(self):
         selected_presets = self._gather_selected_presets_with_names()
@@ -1589,10 +2076,12 @@ class App(tk.Tk):
 
         tasks = []
         for preset_name, preset_prompt in selected_presets:
-            prompt_tokens = self._tokenize_prompt(preset_prompt)
+            # 프리셋 문자열 기준으로 캐시된 토큰/집합을 재사용 (프리셋이 수정되면 문자열이 달라져 자동으로 새로 계산)
+            prompt_tokens = _tokenize_prompt_cached(preset_prompt)
+            prompt_set = _prompt_token_set_cached(preset_prompt)
 
             # 병합: 선택된 토큰 먼저, 그다음 원본 중 중복되지 않는 항목
-            merged_tokens = self._unique_preserve_order(prompt_tokens + [t for t in original_tokens if t not in prompt_tokens])
+            merged_tokens = self._unique_preserve_order([*prompt_tokens, *(t for t in original_tokens if t not in prompt_set)])
             merged_text = ', '.join(merged_tokens)
 
             task_name = f"{preset_name}" # 파일명으로 바로 사용
@@ -1604,9 +2093,10 @@ class App(tk.Tk):
         dlg.geometry("600x400")
 
         model_name = self.model_name_entry.get().strip()
+        version_placeholder = self.model_version_entry.placeholder
         model_version = self.model_version_entry.get().strip()
         lora = self.lora_entry.get().strip()
-        version_display = f" (버전: {model_version})" if model_version and model_version != self.model_version_entry.placeholder else ""
+        version_display = f" (버전: {model_version})" if model_version and model_version != version_placeholder else ""
         info_text = f"{len(tasks)}개의 프롬프트가 생성됩니다. 아래 목록을 확인 후 실행하세요.\n\n모델: {model_name or '없음'}{version_display}, LoRA: {lora or '없음'}"
         info_label = ttk.Label(dlg, text=info_text)
         info_label.pack(padx=10, pady=10, anchor='w')
@@ -1614,9 +2104,7 @@ class App(tk.Tk):
         text_area = scrolledtext.ScrolledText(dlg, wrap=tk.WORD, height=15)
         text_area.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
 
-        full_prompt_list_text = ""
-        for name, prompt in tasks:
-            full_prompt_list_text += f"--- {name} ---\n{prompt}\n\n"
+        full_prompt_list_text = "".join(f"--- {name} ---\n{prompt}\n\n" for name, prompt in tasks)
 
         text_area.insert('1.0', full_prompt_list_text)
         text_area.config(state='disabled')
@@ -1654,7 +2142,7 @@ class App(tk.Tk):
             except Exception as e:
                 print(f"부스터 '{booster_name}' {action} 중 오류: {e}")
                 # Revert checkbox state on failure
-                self.after(0, lambda: var.set(not is_enabled))
+                self.after(0, var.set, not is_enabled)
                 self.after(100, lambda e=e: messagebox.showerror("부스터 오류", f"'{booster_name}' {action} 중 오류가 발생했습니다:\n{e}"))
         
         threading.Thread(target=task, daemon=True).start()
@@ -1682,9 +2170,6 @@ class App(tk.Tk):
 
         threading.Thread(target=task, daemon=True).start()
 
-    def update_booster_ui_state(self):
-        pass
-
     def on_crawler_started(self, exception: Exception | None):
         """Callback executed when crawler initialization is complete."""
         self.progress_bar.stop()
@@ -1692,7 +2177,7 @@ class App(tk.Tk):
         self.progress_bar.config(mode='determinate') # Reset for generation
 
         self.set_ui_state(False)  # Re-enable UI
-        self.update_booster_ui_state()
+        self._invalidate_active_config()
         if exception:
             print(f"크롤러 초기화 중 오류: {exception}")
             messagebox.showerror("크롤러 오류", f"크롤러 초기화에 실패했습니다:\n{exception}")
@@ -1704,13 +2189,11 @@ class App(tk.Tk):
 
     def on_headless_toggle(self):
         """Handles the event when the headless checkbox is toggled."""
-        self.update_booster_ui_state()  # Update UI immediately
         is_headless = self.headless_var.get()
         mode = "활성화" if is_headless else "비활성화"
         if not messagebox.askyesno("크롤러 재시작", f"Headless 모드를 '{mode}'(으)로 변경합니다.\n크롤러를 재시작하시겠습니까?"):
-            # User cancelled, revert the checkbox and the UI state
+            # User cancelled, revert the checkbox
             self.headless_var.set(not is_headless)
-            self.update_booster_ui_state()
             return
 
         messagebox.showinfo("재시작", f"Headless 모드 변경: {mode}. 크롤러를 재시작합니다.")
@@ -1744,7 +2227,7 @@ class App(tk.Tk):
         self.progress_bar.config(mode='determinate') # Reset for generation
 
         self.set_ui_state(False) # Re-enable UI
-        self.update_booster_ui_state()
+        self._invalidate_active_config()
         if exception:
             print(f"크롤러 재시작 중 오류: {exception}")
             messagebox.showerror("크롤러 오류", f"크롤러 재시작에 실패했습니다:\n{exception}")
@@ -1776,8 +2259,9 @@ class App(tk.Tk):
             try:
                 screenshot_path = self.crawler_manager.run_take_screenshot()
                 if screenshot_path:
-                    # Schedule image loading on the main thread
-                    self.after(0, self.load_generated_image, screenshot_path)
+                    # Decode in this worker thread; only the display step runs on the main thread
+                    self._preview_token = token = object()
+                    self._decode_and_display(screenshot_path, *self._preview_box_size(), token)
                 else:
                     self.after(0, lambda: messagebox.showwarning("스크린샷 실패", "스크린샷을 생성하지 못했습니다."))
             except Exception as e:
@@ -1794,33 +2278,9 @@ class App(tk.Tk):
         license_window.transient(self)
         license_window.grab_set()
 
-        mit_license_text = """
-MIT License
-
-Copyright (c) 2024 [Copyright Holder]
-
-Permission is hereby granted, free of charge, to any person obtaining a copy
-of this software and associated documentation files (the "Software"), to deal
-in the Software without restriction, including without limitation the rights
-to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
-copies of the Software, and to permit persons to whom the Software is
-furnished to do so, subject to the following conditions:
-
-The above copyright notice and this permission notice shall be included in all
-copies or substantial portions of the Software.
-
-THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
-IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
-FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
-AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
-LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
-OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
-SOFTWARE.
-"""
-        
         text_area = scrolledtext.ScrolledText(license_window, wrap=tk.WORD, height=10)
         text_area.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        text_area.insert(tk.END, mit_license_text.strip())
+        text_area.insert(tk.END, _MIT_LICENSE_TEXT)
         text_area.config(state='disabled')
 
         close_button = ttk.Button(license_window, text="Close", command=license_window.destroy)
@@ -1831,6 +2291,9 @@ SOFTWARE.
     def on_close(self):
         # Disable all UI to prevent user interaction and show a closing message.
         self.set_ui_state(True) 
+        # 대기 중인 모델 프리셋 저장을 즉시 반영
+        self._flush_presets_save()
+        self._prep_pool.shutdown(wait=False)
         print("프로그램 종료 중... 크롤러를 안전하게 종료합니다.")
 
         def shutdown_task():
@@ -1843,10 +2306,27 @@ SOFTWARE.
             finally:
                 # After the background task is done, schedule destroying the window 
                 # on the main thread.
-                self.after(0, self.destroy)
+                try:
+                    self.after(0, self._finish_close)
+                except (RuntimeError, tk.TclError):
+                    pass  # 시간 초과로 창이 이미 닫힌 경우
 
         # Run the blocking stop() call in a background thread to keep the GUI responsive.
-        threading.Thread(target=shutdown_task, daemon=True).start()
+        shutdown_thread = threading.Thread(target=shutdown_task, daemon=True)
+        shutdown_thread.start()
+
+        # stop()이 멈춰도 창은 SHUTDOWN_TIMEOUT_MS 뒤에 닫히도록 보장 (daemon 스레드는 프로세스와 함께 종료)
+        def force_close():
+            if shutdown_thread.is_alive():
+                print("크롤러 종료가 지연되어 창을 먼저 닫습니다.")
+                self._finish_close()
+        self.after(SHUTDOWN_TIMEOUT_MS, force_close)
+
+    def _finish_close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.destroy()
 
 
 if __name__ == "__main__":
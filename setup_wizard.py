@@ -5,31 +5,116 @@ import subprocess
 import os
 import sys
 import asyncio
+import functools
+import glob
+import json
 import shutil
-
-# crawler.py와 gui.py의 경로 설정을 일관성 있게 가져옵니다.
-try:
-    from crawler import PixaiCrawler
-except ImportError:
-    # PyInstaller 환경 등에서 crawler.py를 직접 찾지 못할 경우를 대비
-    sys.path.append(os.path.dirname(__file__))
-    from crawler import PixaiCrawler
+import tempfile
+import time
+from importlib import metadata
+from collections import deque
 
 # 경로 설정
 USER_DATA = os.path.join(os.getenv("APPDATA") or os.path.expanduser("~"), "PixAI-Gen-Bot", "playwright_user_data")
 FLAG_FILE = os.path.join(USER_DATA, '.setup_complete')
+MANIFEST_FILE = os.path.join(USER_DATA, '.setup_manifest.json')  # 설치 당시 Playwright/Chromium 버전
+LOG_MAX_LINES = 5000
+LOG_FLUSH_MS = 50
+LOG_FLUSH_BATCH = 200  # 한 번의 flush에서 출력할 최대 줄 수
+MIN_FREE_DISK_BYTES = 1024 ** 3  # Chromium 설치와 사용자 데이터에 필요한 대략적인 여유 공간
+INSTALL_STALL_TIMEOUT = 300      # 설치 프로그램 출력이 이 시간(초) 동안 없으면 멈춘 것으로 보고 종료
+INSTALL_STALL_CHECK_INTERVAL = 30
 
 if getattr(sys, 'frozen', False):
     BASE = os.path.dirname(sys.executable)
 else:
     BASE = os.path.abspath(os.path.dirname(__file__))
 
+def _atomic_write_text(path, text):
+    """임시 파일에 쓰고 디스크에 반영한 뒤 교체하여, 도중에 종료되어도 빈 파일이 남지 않게 합니다."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+@functools.lru_cache(maxsize=4)
+def _resolve_python():
+    """PATH에서 시스템 파이썬을 찾습니다. 재시도 시 PATH를 다시 뒤지지 않도록 결과를 캐시합니다."""
+    return shutil.which("python") or shutil.which("py")
+
+def get_playwright_browsers_path():
+    """Playwright가 브라우저를 설치하는 폴더를 반환합니다 (PLAYWRIGHT_BROWSERS_PATH 우선)."""
+    custom_path = os.environ.get("PLAYWRIGHT_BROWSERS_PATH")
+    # "0"은 패키지 내부 설치를 의미하므로 기본 경로를 사용
+    if custom_path and custom_path != "0":
+        return custom_path
+    local_app_data = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    return os.path.join(local_app_data, "ms-playwright")
+
+def _find_chromium_executables():
+    """Playwright 브라우저 폴더에 설치된 Chromium 실행 파일 경로 목록을 반환합니다."""
+    # 버전에 따라 chrome-win 또는 chrome-win64 폴더를 사용
+    return glob.glob(os.path.join(get_playwright_browsers_path(), "chromium-*", "chrome-win*", "chrome.exe"))
+
+def is_chromium_installed():
+    """
+    Chromium 실행 파일이 설치되어 있는지 확인합니다.
+    bootstrap(실행 분기)과 설정 마법사(설치 생략)가 같은 기준을 쓰도록 이 함수만 사용하세요.
+    """
+    return bool(_find_chromium_executables())
+
+def _read_chromium_rev():
+    """설치된 Chromium 중 가장 높은 리비전(chromium-<rev> 폴더 이름)을 반환합니다. 없으면 None."""
+    revs = []
+    for exe in _find_chromium_executables():
+        rev = os.path.basename(os.path.dirname(os.path.dirname(exe))).partition("-")[2]
+        if rev.isdigit():
+            revs.append(int(rev))
+    return str(max(revs)) if revs else None
+
+def _playwright_version():
+    # playwright를 import하지 않고 패키지 메타데이터만 읽음
+    try:
+        return metadata.version("playwright")
+    except metadata.PackageNotFoundError:
+        return None
+
+def _write_install_manifest():
+    _atomic_write_text(MANIFEST_FILE, json.dumps({"pw": _playwright_version(), "rev": _read_chromium_rev(), "installed_at": time.time()}))
+
+def _install_manifest_matches():
+    """
+    이전 설치 기록이 현재 Playwright 버전과 같고 Chromium도 남아 있으면 True.
+    이 경우 설치 과정을 건너뛸 수 있습니다.
+    """
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    pw_version = _playwright_version()
+    return (pw_version is not None
+            and manifest.get("pw") == pw_version
+            and manifest.get("rev") is not None
+            and manifest.get("rev") == _read_chromium_rev())
+
 class SetupWizard(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("PixAI Gen Bot - 초기 설정")
         self.geometry("600x400")
         self.resizable(False, False)
+        # 설정이 끝나면 True. mainloop()가 끝난 뒤 호출한 쪽에서 메인 GUI를 실행합니다.
+        self.launch_main_requested = False
 
         style = ttk.Style(self)
         style.theme_use('clam')
@@ -43,35 +128,67 @@ class SetupWizard(tk.Tk):
         self.progress = ttk.Progressbar(self, orient='horizontal', length=100, mode='indeterminate')
         self.progress.pack(fill=tk.X, padx=20, pady=(0, 20))
 
-        self.after(200, self.start_setup_thread)
+        # 로그는 모아 두었다가 LOG_FLUSH_MS마다 한 번에 출력
+        self._log_pending = deque(maxlen=LOG_MAX_LINES)
+        self._log_lock = threading.Lock()
+        self._log_flush_scheduled = False
+
+        if _install_manifest_matches():
+            # 같은 버전으로 이미 설치가 끝난 상태: 진행바 없이 바로 메인 앱 실행
+            self.log("이전 설치 정보가 확인되어 설정을 건너뜁니다.")
+            self.after(0, self.launch_main_app)
+        else:
+            self.after(200, self.start_setup_thread)
 
     def log(self, message):
-        def _update():
-            self.log_text.configure(state='normal')
-            self.log_text.insert(tk.END, message + "\n")
-            self.log_text.see(tk.END)
-            self.log_text.configure(state='disabled')
-        if self.winfo_exists():
-            self.after(0, _update)
+        with self._log_lock:
+            self._log_pending.append(message)
+            if self._log_flush_scheduled:
+                return
+            self._log_flush_scheduled = True
+        try:
+            self.after(LOG_FLUSH_MS, self._flush_log)
+        except (RuntimeError, tk.TclError):
+            # 창이 이미 닫힌 경우
+            pass
+
+    def _flush_log(self):
+        # 설치 로그처럼 줄이 많이 쌓이면 LOG_FLUSH_BATCH씩 나눠서 출력해 진행바 애니메이션이 멈추지 않게 함
+        with self._log_lock:
+            count = min(len(self._log_pending), LOG_FLUSH_BATCH)
+            lines = [self._log_pending.popleft() for _ in range(count)]
+            more = bool(self._log_pending)
+            self._log_flush_scheduled = more
+        if not self.winfo_exists():
+            return
+        if more:
+            self.after(LOG_FLUSH_MS, self._flush_log)
+        if not lines:
+            return
+        self.log_text.configure(state='normal')
+        self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+        # LOG_MAX_LINES를 넘는 만큼 오래된 줄 삭제
+        excess = int(self.log_text.index('end-1c').split('.')[0]) - LOG_MAX_LINES
+        if excess > 0:
+            self.log_text.delete('1.0', f'{excess + 1}.0')
+        self.log_text.see(tk.END)
+        self.log_text.configure(state='disabled')
 
     def start_setup_thread(self):
-        self.progress.start()
-        thread = threading.Thread(target=self.run_setup, daemon=True)
+        # daemon 스레드: 설치 도중 창을 닫으면 프로세스가 백그라운드에 남지 않고 함께 종료됨
+        thread = threading.Thread(target=self.run_setup, name="setup", daemon=True)
         thread.start()
 
     def run_setup(self):
         try:
-            self.log("--- 1/2: 브라우저 설치 ---")
-            if not self.install_chromium():
-                raise Exception("브라우저 설치에 실패했습니다.")
+            asyncio.run(self._run_setup_async())
             
             # self.log("\n--- 2/2: 사용자 로그인 설정 ---")
             # if not self.run_user_login_setup():
             #     raise Exception("사용자 로그인 설정에 실패했습니다.")
 
             self.log("\n--- 설정 완료 ---")
-            with open(FLAG_FILE, 'w') as f:
-                f.write('done')
+            _atomic_write_text(FLAG_FILE, 'done')
             self.after(100, self.launch_main_app)
 
         except Exception as e:
@@ -81,22 +198,45 @@ class SetupWizard(tk.Tk):
         finally:
             self.after(0, self.progress.stop)
 
+    async def _run_setup_async(self):
+        self.log("--- 1/2: 브라우저 설치 ---")
+        # 실제로 설치할 것이 있을 때만 진행바 애니메이션 시작 (설정 스레드에서는 after로 메인 스레드에 요청)
+        if not _install_manifest_matches():
+            self.after(0, self.progress.start)
+        # 네트워크를 기다리는 브라우저 설치와 디스크 작업인 사용자 데이터 준비를 동시에 진행
+        install_ok, _ = await asyncio.gather(
+            self.install_chromium(),
+            self._prepare_user_data(),
+        )
+        if not install_ok:
+            raise Exception("브라우저 설치에 실패했습니다.")
+        _write_install_manifest()
+
+    async def _prepare_user_data(self):
+        """사용자 데이터 폴더를 만들고 남은 디스크 공간을 확인합니다."""
+        await asyncio.to_thread(os.makedirs, USER_DATA, exist_ok=True)
+        free = (await asyncio.to_thread(shutil.disk_usage, USER_DATA)).free
+        if free < MIN_FREE_DISK_BYTES:
+            self.log(f"경고: 디스크 여유 공간이 부족합니다 ({free // (1024 ** 2)} MB 남음).")
+
     def launch_main_app(self):
+        # 설정이 완료되었으므로 마법사를 닫고, mainloop()가 끝난 뒤 같은 프로세스에서 메인 GUI를 실행합니다.
+        # (after() 콜백 안에서 실행하면 오류가 Tk 콜백 핸들러로 가서 EXE에서는 아무 메시지 없이 종료됨)
+        self.launch_main_requested = True
         self.destroy()
-        # 설정이 완료되었으므로 애플리케이션을 재시작하여 메인 GUI를 로드합니다.
-        try:
-            # 현재 실행 파일 경로로 재시작
-            os.execl(sys.executable, *sys.argv)
-        except Exception as e:
-            messagebox.showerror("재시작 실패", f"프로그램을 재시작하는 데 실패했습니다. 수동으로 다시 시작해주세요.\n오류: {e}")
-            sys.exit(1)
 
-    def install_chromium(self):
+    async def install_chromium(self):
         try:
+            # 같은 Playwright 버전으로 설치한 기록이 있을 때만 하위 프로세스를 띄우지 않음.
+            # 기록이 없거나 버전이 다르면 (이미 설치된 경우에도 안전한) playwright install을 그대로 실행
+            if _install_manifest_matches():
+                self.log("Chromium 브라우저가 이미 설치되어 있습니다.")
+                return True
+
             # frozen(EXE)일 때 sys.executable로 다시 호출하면 재귀 발생.
             # 따라서 frozen이면 시스템 파이썬을 먼저 찾고, 없으면 플레이라이트 API로 설치 시도.
             if getattr(sys, "frozen", False):
-                python_cmd = shutil.which("python") or shutil.which("py")
+                python_cmd = _resolve_python()
             else:
                 python_cmd = sys.executable
 
@@ -104,7 +244,7 @@ class SetupWizard(tk.Tk):
                 # 시스템 파이썬이 없으면 파이썬 API 직접 호출(플레이라이트 내부 API는 변경될 수 있음)
                 try:
                     from playwright.__main__ import main as pw_main
-                    pw_main(["install", "chromium"])
+                    await asyncio.to_thread(pw_main, ["install", "chromium"])
                     return True
                 except Exception as e:
                     self.log(f"시스템 Python 없음 및 Playwright API 호출 실패: {e}")
@@ -112,19 +252,27 @@ class SetupWizard(tk.Tk):
 
             self.log("Chromium 브라우저 다운로드를 시작합니다 (몇 분 소요될 수 있습니다).")
             install_cmd = [python_cmd, "-m", "playwright", "install", "chromium"]
-            proc = subprocess.Popen(
-                install_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding='utf-8',
-                shell=False
+            # 파이프로 연결되면 자식 파이썬이 출력을 모아서 보내므로 버퍼링을 끔. 출력은 utf-8로 디코딩함
+            child_env = os.environ.copy()
+            child_env["PYTHONUNBUFFERED"] = "1"
+            child_env.setdefault("PYTHONIOENCODING", "utf-8")
+            # 콘솔로 실행된 경우 이 프로세스의 출력이 자식 출력보다 늦게 찍히지 않도록 먼저 비움
+            for stream in (sys.stdout, sys.stderr):
+                if stream is not None:
+                    stream.flush()
+            # Windows에서는 콘솔 창을 만들지 않음 (EXE/.pyw 실행 시 콘솔이 잠깐 뜨는 것 방지)
+            creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+            proc = await asyncio.create_subprocess_exec(
+                *install_cmd,
+                env=child_env,
+                creationflags=creationflags,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=65536,  # StreamReader 버퍼 크기 (한 줄의 최대 길이)
             )
             # 실시간 로그 표출
-            for line in iter(proc.stdout.readline, ""):
-                if line:
-                    self.log(line.rstrip())
-            proc.wait()
+            if await self._drain_with_watchdog(proc):
+                raise Exception(f"설치 프로그램이 {INSTALL_STALL_TIMEOUT}초 동안 응답이 없어 중단했습니다.")
             if proc.returncode != 0:
                 raise subprocess.CalledProcessError(proc.returncode, install_cmd)
             self.log("Chromium 브라우저 설치가 완료되었습니다.")
@@ -133,25 +281,74 @@ class SetupWizard(tk.Tk):
             self.log(f"브라우저 설치 중 오류: {e}")
             return False
 
+    async def _drain_with_watchdog(self, proc):
+        """
+        stdout/stderr를 각각 읽어 로그에 출력하며 프로세스 종료까지 기다립니다.
+        두 파이프를 동시에 비우므로 한쪽 버퍼가 가득 차 자식 프로세스가 멈추는 일이 없습니다.
+        출력이 INSTALL_STALL_TIMEOUT 동안 없으면 프로세스를 종료하고 True를 반환합니다.
+        """
+        last_output = time.monotonic()
+        stalled = False
+
+        async def drain(stream):
+            nonlocal last_output
+            async for line in stream:
+                last_output = time.monotonic()
+                self.log(line.decode('utf-8', 'replace').rstrip())
+
+        async def watchdog():
+            nonlocal stalled
+            while proc.returncode is None:
+                await asyncio.sleep(INSTALL_STALL_CHECK_INTERVAL)
+                if proc.returncode is None and time.monotonic() - last_output > INSTALL_STALL_TIMEOUT:
+                    stalled = True
+                    proc.terminate()
+                    # 손자 프로세스(드라이버)가 파이프를 계속 잡고 있을 수 있으므로 EOF를 기다리지 않음
+                    for task in drain_tasks:
+                        task.cancel()
+                    return
+
+        drain_tasks = [asyncio.create_task(drain(proc.stdout)), asyncio.create_task(drain(proc.stderr))]
+        watch_task = asyncio.create_task(watchdog())
+        try:
+            results = await asyncio.gather(*drain_tasks, return_exceptions=True)
+            for result in results:
+                # 한 줄이 버퍼 한도를 넘는 경우(ValueError) 등 해당 파이프의 로그가 끊긴 이유를 남김
+                if isinstance(result, Exception) and not isinstance(result, asyncio.CancelledError):
+                    self.log(f"설치 로그 읽기 중단: {result!r}")
+            if not stalled:
+                await proc.wait()
+            else:
+                # proc.wait()는 파이프가 모두 닫혀야 끝나므로 손자 프로세스가 남아 있으면 오래 기다리지 않음
+                try:
+                    await asyncio.wait_for(proc.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            watch_task.cancel()
+        return stalled
+
     def run_user_login_setup(self):
         self.log("로그인 설정을 위해 브라우저를 실행합니다.")
         self.log("잠시 후 열리는 브라우저에서 PixAI에 로그인해주세요.")
         self.log("로그인이 완료되면, 반드시 브라우저 창을 닫아야 다음 단계로 진행됩니다.")
         
-        loop = None
         try:
+            # Playwright를 포함한 무거운 import는 메인 스레드가 아닌 설정 스레드에서 수행
+            try:
+                from crawler import PixaiCrawler
+            except ImportError:
+                # PyInstaller 환경 등에서 crawler.py를 직접 찾지 못할 경우를 대비
+                sys.path.append(os.path.dirname(__file__))
+                from crawler import PixaiCrawler
             crawler_for_setup = PixaiCrawler(headless=False, USER_DATA_DIR=USER_DATA)
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(crawler_for_setup._run_first_time_setup())
+            # 루프 생성/정리는 asyncio.run에 맡김 (Windows 기본 루프는 하위 프로세스를 지원하는 Proactor)
+            asyncio.run(crawler_for_setup._run_first_time_setup())
             self.log("사용자 설정이 저장되었습니다.")
             return True
         except Exception as e:
             self.log(f"로그인 설정 중 오류 발생: {e}")
             return False
-        finally:
-            if loop and not loop.is_closed():
-                loop.close()
 
 if __name__ == "__main__":
     # 이 파일은 bootstrap.py를 통해 실행되어야 합니다.
@@ -159,3 +356,6 @@ if __name__ == "__main__":
     os.makedirs(USER_DATA, exist_ok=True)
     wizard = SetupWizard()
     wizard.mainloop()
+    if wizard.launch_main_requested:
+        import gui
+        gui.App().mainloop()